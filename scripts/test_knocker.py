@@ -1,43 +1,82 @@
 #!/usr/bin/env python3
 import os
 import sys
+import asyncio
+import functools
+import json
+import base64
+import binascii
+import atexit
+import abc
+import faulthandler
 import time
 import socket
+import errno
+import selectors
+import struct
+import glob
 import shutil
-import random
 import string
 import threading
+import queue
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
+
+try:
+    # Optional: faster encoding for the persistent job protocol
+    import orjson
+except ImportError:
+    orjson = None
 
 # ---------------------------------------------------------------------------
 # Configuration and helpers
 # ---------------------------------------------------------------------------
 
+# Interned once, shared by every test case and job request
+TCP = sys.intern("tcp")
+UDP = sys.intern("udp")
+LH = sys.intern("127.0.0.1")
+
+# Generous upper bound for a full run; past it, all thread stacks are dumped
+RUN_WATCHDOG_S = 120.0
+
+
 @dataclass
 class RunResult:
     code: int
     out: str
     err: str
-    duration_s: float
+    duration_ns: int
+
+    @property
+    def duration_s(self) -> float:
+        return self.duration_ns / 1e9
 
 
 def is_windows() -> bool:
     return os.name == "nt"
 
 
+@functools.lru_cache(maxsize=None)
 def project_root() -> str:
     # go up one level to project root
     return os.path.abspath(os.path.join(os.path.dirname(__file__), "..")) 
 
 
+@functools.lru_cache(maxsize=None)
 def default_bin_path(debug: bool = True) -> str:
     name = "async_port_knocker" + (".exe" if is_windows() else "")
     target = "debug" if debug else "release"
     return os.path.join(project_root(), "target", target, name)
 
 
+@functools.lru_cache(maxsize=1)
+def have_cargo() -> bool:
+    return shutil.which("cargo") is not None
+
+
 def build_binary() -> str:
     # Change project build here
     cmd = ["cargo", "build", "-q"]
@@ -63,6 +102,16 @@ def build_binary() -> str:
     return bin_path
 
 
+def binary_is_fresh(bin_path: str) -> bool:
+    # Newer than Cargo.toml and every source file means cargo has nothing to do
+    root = project_root()
+    sources = glob.glob(os.path.join(root, "src", "**", "*.rs"), recursive=True)
+    sources.append(os.path.join(root, "Cargo.toml"))
+    src_mtime = max(os.path.getmtime(p) for p in sources if os.path.exists(p))
+    return os.path.getmtime(bin_path) >= src_mtime
+
+
+@functools.lru_cache(maxsize=None)
 def find_or_build_binary() -> str:
     env_bin = os.environ.get("KNOCKER_BIN")
     if env_bin:
@@ -72,19 +121,228 @@ def find_or_build_binary() -> str:
         print(f"KNOCKER_BIN set but not executable: {env_bin}")
         sys.exit(1)
 
-    # Try existing debug build first
+    # Try existing debug build first, skipping cargo if it is up to date
     bin_path = default_bin_path(debug=True)
-    if os.path.exists(bin_path) and os.access(bin_path, os.X_OK):
+    have_bin = os.path.exists(bin_path) and os.access(bin_path, os.X_OK)
+    if have_bin and binary_is_fresh(bin_path):
         print(f"Using existing binary: {bin_path}")
         return bin_path
 
-    # Build if missing
-    if shutil.which("cargo") is None:
+    # Build if missing or stale
+    if not have_cargo():
+        if have_bin:
+            print(f"cargo not found in PATH, using stale binary: {bin_path}")
+            return bin_path
         print("cargo not found in PATH and no binary specified via KNOCKER_BIN.")
         sys.exit(1)
     return build_binary()
 
 
+# ---------------------------------------------------------------------------
+# Persistent knocker processes
+# ---------------------------------------------------------------------------
+#
+# With KNOCKER_BIN_PERSISTENT=1 the binary is started once per worker thread in
+# `--stdin-jobs` mode instead of being spawned for every knock. Protocol: one
+# JSON object {"args": [...]} per stdin line (the same argv the one-shot mode
+# takes), answered by one JSON object {"code", "out", "err"} per stdout line.
+# Replies are read from non-blocking pipes through a selector, which the
+# Windows select backend does not support, so the mode is POSIX-only.
+
+_persistent_lock = threading.Lock()
+_persistent_knockers: List["PersistentKnocker"] = []
+_persistent_local = threading.local()
+
+
+def use_persistent() -> bool:
+    if is_windows():
+        return False
+    return os.environ.get("KNOCKER_BIN_PERSISTENT", "0") != "0"
+
+
+def _dump_job(args: List[str]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps({"args": args}) + b"\n"
+    return json.dumps({"args": args}).encode("utf-8") + b"\n"
+
+
+class PersistentKnocker:
+    def __init__(self, bin_path: str):
+        self.bin_path = bin_path
+        self.proc = subprocess.Popen(
+            [bin_path, "--stdin-jobs"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0,
+            cwd=project_root(),
+        )
+        self.sel = selectors.DefaultSelector()
+        for f in (self.proc.stdout, self.proc.stderr):
+            os.set_blocking(f.fileno(), False)
+            self.sel.register(f, selectors.EVENT_READ)
+        # Bytes read past the current reply / stray stderr from the process
+        self._out = bytearray()
+        self._err = bytearray()
+        self._stdout_eof = False
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def _read_line(self, deadline_ns: int) -> Optional[bytes]:
+        # Read both pipes until stdout holds a full line; None on EOF/timeout
+        while b"\n" not in self._out:
+            remaining_ns = deadline_ns - time.perf_counter_ns()
+            if remaining_ns <= 0 or not self.sel.get_map():
+                return None
+            for key, _ in self.sel.select(timeout=remaining_ns / 1e9):
+                try:
+                    chunk = os.read(key.fd, 4096)
+                except BlockingIOError:
+                    continue
+                if not chunk:
+                    self.sel.unregister(key.fileobj)
+                    if key.fileobj is self.proc.stdout:
+                        self._stdout_eof = True
+                        return None
+                elif key.fileobj is self.proc.stdout:
+                    self._out += chunk
+                else:
+                    self._err += chunk
+        line, _, rest = bytes(self._out).partition(b"\n")
+        self._out = bytearray(rest)
+        return line
+
+    def _drain_stderr(self, deadline_ns: int):
+        # stdout is closed, so the process is exiting; collect what it still
+        # writes to stderr (usually why it died) until EOF or the deadline
+        while self.sel.get_map():
+            remaining_ns = deadline_ns - time.perf_counter_ns()
+            if remaining_ns <= 0:
+                return
+            for key, _ in self.sel.select(timeout=remaining_ns / 1e9):
+                try:
+                    chunk = os.read(key.fd, 4096)
+                except BlockingIOError:
+                    continue
+                if not chunk:
+                    self.sel.unregister(key.fileobj)
+                elif key.fileobj is self.proc.stderr:
+                    self._err += chunk
+
+    def run(self, args: List[str], run_timeout_s: float) -> RunResult:
+        start = time.perf_counter_ns()
+        deadline_ns = start + int(run_timeout_s * 1e9)
+        try:
+            self.proc.stdin.write(_dump_job(args))
+        except BrokenPipeError:
+            self._stdout_eof = True
+            line = None
+        else:
+            line = self._read_line(deadline_ns)
+        if line is None and self._stdout_eof:
+            self._drain_stderr(deadline_ns)
+        end = time.perf_counter_ns()
+        stray_err = _decode(bytes(self._err))
+        self._err.clear()
+        if line is None:
+            if not self._stdout_eof:
+                # Stuck mid-job: kill and reap it so it is never reused
+                self.close(kill=True)
+                return RunResult(
+                    code=124,
+                    out="",
+                    err=stray_err or "Process timeout",
+                    duration_ns=end - start,
+                )
+            self.close()
+            return RunResult(
+                code=self.proc.returncode or 1,
+                out="",
+                err=stray_err or "Persistent knocker exited unexpectedly",
+                duration_ns=end - start,
+            )
+        try:
+            reply = orjson.loads(line) if orjson is not None else json.loads(line)
+            code, out, err = reply["code"], reply["out"], reply["err"]
+        except (ValueError, TypeError, KeyError):
+            # Out of sync with the protocol: later replies can't be trusted,
+            # so kill it and let run_knocker retire it
+            self.close(kill=True)
+            return RunResult(
+                code=1,
+                out="",
+                err=(stray_err + "Malformed persistent knocker reply: "
+                     + _decode(line)),
+                duration_ns=end - start,
+            )
+        return RunResult(
+            code=code,
+            out=out,
+            err=stray_err + err,
+            duration_ns=end - start,
+        )
+
+    def close(self, kill: bool = False):
+        # Idempotent; always leaves the process reaped and the pipes closed
+        self.sel.close()
+        if kill and self.alive():
+            self.proc.kill()
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=1.0)
+        except Exception:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc.stdout.close()
+        self.proc.stderr.close()
+
+
+def _retire_persistent_knocker(knocker: PersistentKnocker):
+    # Close it and forget it, so this thread's next call starts a fresh one
+    knocker.close()
+    with _persistent_lock:
+        if knocker in _persistent_knockers:
+            _persistent_knockers.remove(knocker)
+    if getattr(_persistent_local, "knocker", None) is knocker:
+        _persistent_local.knocker = None
+
+
+def _persistent_knocker(bin_path: str) -> PersistentKnocker:
+    knocker = getattr(_persistent_local, "knocker", None)
+    if knocker is not None and (
+        knocker.bin_path != bin_path or not knocker.alive()
+    ):
+        # Different binary requested, or the old process has exited
+        _retire_persistent_knocker(knocker)
+        knocker = None
+    if knocker is None:
+        knocker = PersistentKnocker(bin_path)
+        _persistent_local.knocker = knocker
+        with _persistent_lock:
+            _persistent_knockers.append(knocker)
+    return knocker
+
+
+@atexit.register
+def _close_persistent_knockers():
+    with _persistent_lock:
+        knockers = list(_persistent_knockers)
+        _persistent_knockers.clear()
+    for knocker in knockers:
+        knocker.close()
+
+
+def _decode(data: Optional[bytes]) -> str:
+    # Raw pipe bytes are decoded once, after the process is done
+    return data.decode("utf-8", "replace") if data else ""
+
+
+@functools.lru_cache(maxsize=256)
+def _seq_str(seq: Tuple[int, ...]) -> str:
+    return ",".join(map(str, seq))
+
+
 def run_knocker(
     bin_path: str,
     host: str,
@@ -100,13 +358,12 @@ def run_knocker(
     run_timeout_s: float = 30.0,
 ) -> RunResult:
     args = [
-        bin_path,
         "-H",
         host,
         "--protocol",
         protocol,
         "--sequence",
-        ",".join(str(p) for p in sequence),
+        _seq_str(tuple(sequence)),
         "--timeout",
         str(timeout_ms),
         "--delay",
@@ -123,27 +380,36 @@ def run_knocker(
     if extra_args:
         args += extra_args
 
-    start = time.monotonic()
+    if use_persistent():
+        knocker = _persistent_knocker(bin_path)
+        res = knocker.run(args, run_timeout_s)
+        if not knocker.alive():
+            _retire_persistent_knocker(knocker)
+        return res
+
+    start = time.perf_counter_ns()
     try:
         cp = subprocess.run(
-            args,
+            [bin_path] + args,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
             timeout=run_timeout_s,
             cwd=project_root(),
         )
-        end = time.monotonic()
+        end = time.perf_counter_ns()
         return RunResult(
-            code=cp.returncode, out=cp.stdout, err=cp.stderr, duration_s=end - start
+            code=cp.returncode,
+            out=_decode(cp.stdout),
+            err=_decode(cp.stderr),
+            duration_ns=end - start,
         )
     except subprocess.TimeoutExpired as e:
-        end = time.monotonic()
+        end = time.perf_counter_ns()
         return RunResult(
             code=124,
-            out=e.stdout or "",
-            err=e.stderr or "Process timeout",
-            duration_s=end - start,
+            out=_decode(e.stdout),
+            err=_decode(e.stderr) or "Process timeout",
+            duration_ns=end - start,
         )
 
 
@@ -151,35 +417,35 @@ def run_knocker(
 # Local helper servers
 # ---------------------------------------------------------------------------
 
-class TcpServer:
-    def __init__(self, host: str = "127.0.0.1"):
-        self.host = host
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.sock.bind((host, 0))
-        self.port = self.sock.getsockname()[1]
-        self.sock.listen(5)
-        self.sock.settimeout(0.2)
+# Serves `self.sock` from a thread until stop(). The thread blocks in select()
+# until the socket is readable or stop() writes to the wake end of a
+# socketpair (portable to the Windows select backend, unlike os.pipe), so
+# shutdown never sends traffic to the server itself.
+class SelectorServer(abc.ABC):
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.sock.setblocking(False)
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self.sel = selectors.DefaultSelector()
+        self.sel.register(self.sock, selectors.EVENT_READ)
+        self.sel.register(self._wake_r, selectors.EVENT_READ)
         self.stop_ev = threading.Event()
         self.thread = threading.Thread(target=self._run, daemon=True)
 
     def _run(self):
         while not self.stop_ev.is_set():
-            try:
-                conn, _addr = self.sock.accept()
-                try:
-                    conn.settimeout(0.1)
-                    # Read/ignore a bit to keep the connection simple
-                    try:
-                        conn.recv(16)
-                    except Exception:
-                        pass
-                finally:
-                    conn.close()
-            except socket.timeout:
-                continue
-            except OSError:
-                break
+            for key, _ in self.sel.select(timeout=None):
+                if key.fileobj is self._wake_r:
+                    return
+                if not self._on_readable():
+                    return
+
+    @abc.abstractmethod
+    def _on_readable(self) -> bool:
+        # Handle one readiness event on self.sock; False stops the server
+        ...
 
     def start(self):
         self.thread.start()
@@ -187,93 +453,117 @@ class TcpServer:
     def stop(self):
         self.stop_ev.set()
         try:
-            # Nudge accept
-            with socket.create_connection((self.host, self.port), timeout=0.2):
-                pass
+            self._wake_w.send(b"x")
         except Exception:
             pass
+        # Safe before start(); a stalled thread is a daemon, don't wait forever
+        if self.thread.ident is not None:
+            self.thread.join(timeout=1.0)
+        for closeable in (self.sel, self.sock, self._wake_r, self._wake_w):
+            try:
+                closeable.close()
+            except Exception:
+                pass
+
+
+class TcpServer(SelectorServer):
+    def __init__(self, host: str = LH):
+        self.host = host
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, 0))
+        self.port = sock.getsockname()[1]
+        sock.listen(5)
+        # Reused receive buffer, nothing allocated per connection
+        self._rxbuf = bytearray(16)
+        self._rxmv = memoryview(self._rxbuf)
+        super().__init__(sock)
+
+    def _on_readable(self) -> bool:
         try:
-            self.sock.close()
-        except Exception:
-            pass
-        self.thread.join(timeout=1.0)
+            conn, _addr = self.sock.accept()
+        except OSError as e:
+            # Spurious wake-up keeps serving; anything else stops the server
+            return e.errno in (errno.EAGAIN, errno.EWOULDBLOCK)
+        try:
+            conn.settimeout(0.1)
+            # Read/ignore a bit to keep the connection simple
+            try:
+                conn.recv_into(self._rxmv)
+            except Exception:
+                pass
+        finally:
+            conn.close()
+        return True
 
 
-class UdpEchoServer:
-    def __init__(self, host: str = "127.0.0.1", reply_bytes: bytes = b"pong"):
+class UdpEchoServer(SelectorServer):
+    def __init__(self, host: str = LH, reply_bytes: bytes = b"pong"):
         self.host = host
         self.reply = reply_bytes
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.bind((host, 0))
-        self.port = self.sock.getsockname()[1]
-        self.sock.settimeout(0.2)
-        self.stop_ev = threading.Event()
-        self.thread = threading.Thread(target=self._run, daemon=True)
-
-    def _run(self):
-        while not self.stop_ev.is_set():
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((host, 0))
+        self.port = sock.getsockname()[1]
+        # Reused receive buffer, nothing allocated per datagram
+        self._rxbuf = bytearray(2048)
+        self._rxmv = memoryview(self._rxbuf)
+        super().__init__(sock)
+
+    def _on_readable(self) -> bool:
+        # Drain every queued datagram per wake-up, not just one
+        while True:
             try:
-                data, addr = self.sock.recvfrom(2048)
-                try:
-                    # Echo back or fixed reply
-                    rb = self.reply if self.reply is not None else data
-                    self.sock.sendto(rb, addr)
-                except Exception:
-                    pass
-            except socket.timeout:
-                continue
-            except OSError:
-                break
-
-    def start(self):
-        self.thread.start()
+                nbytes, addr = self.sock.recvfrom_into(self._rxmv)
+            except OSError as e:
+                # Queue empty keeps serving; anything else stops the server
+                return e.errno in (errno.EAGAIN, errno.EWOULDBLOCK)
+            self._handle(self._rxmv[:nbytes], addr)
 
-    def stop(self):
-        self.stop_ev.set()
-        try:
-            # Nudge recv
-            self.sock.sendto(b"", (self.host, self.port))
-        except Exception:
-            pass
+    def _handle(self, data: memoryview, addr):
         try:
-            self.sock.close()
+            # Echo back or fixed reply
+            rb = self.reply if self.reply is not None else data
+            self.sock.sendto(rb, addr)
         except Exception:
             pass
-        self.thread.join(timeout=1.0)
 
 
 # ---------------------------------------------------------------------------
 # DNS payload builder (for UDP test against 8.8.8.8:53)
 # ---------------------------------------------------------------------------
 
-def build_dns_query_hex(qname: str = "example.com", qtype: int = 1) -> str:
+@functools.lru_cache(maxsize=64)
+def pack_name(name: str) -> bytes:
+    # Length-prefixed labels plus the root label, written into one buffer
+    labels = [p.encode("ascii") for p in name.strip(".").split(".")]
+    buf = bytearray(sum(len(label) for label in labels) + len(labels) + 1)
+    o = 0
+    for label in labels:
+        buf[o] = len(label)
+        buf[o + 1:o + 1 + len(label)] = label
+        o += 1 + len(label)
+    buf[o] = 0
+    return bytes(buf)
+
+
+def build_dns_query(qname: str = "example.com", qtype: int = 1) -> bytes:
     # Minimal DNS query with RD=1
-    def pack_name(name: str) -> bytes:
-        parts = name.strip(".").split(".")
-        out = bytearray()
-        for p in parts:
-            b = p.encode("ascii")
-            out.append(len(b))
-            out.extend(b)
-        out.append(0)
-        return bytes(out)
-
-    qid = random.randint(0, 0xFFFF)
-    header = bytearray()
-    header += qid.to_bytes(2, "big")        # ID
-    header += (0x0100).to_bytes(2, "big")   # Flags: RD=1
-    header += (1).to_bytes(2, "big")        # QDCOUNT
-    header += (0).to_bytes(2, "big")        # ANCOUNT
-    header += (0).to_bytes(2, "big")        # NSCOUNT
-    header += (0).to_bytes(2, "big")        # ARCOUNT
-
-    question = bytearray()
-    question += pack_name(qname)
-    question += qtype.to_bytes(2, "big")    # QTYPE
-    question += (1).to_bytes(2, "big")      # QCLASS = IN
-
-    pkt = bytes(header + question)
-    return pkt.hex()
+    # Random ID, then Flags (RD=1), QDCOUNT, ANCOUNT, NSCOUNT, ARCOUNT
+    header = os.urandom(2) + struct.pack(">HHHHH", 0x0100, 1, 0, 0, 0)
+    # QNAME, QTYPE, QCLASS = IN
+    question = pack_name(qname) + struct.pack(">HH", qtype, 1)
+
+    return header + question
+
+
+def build_dns_query_hex(qname: str = "example.com", qtype: int = 1) -> str:
+    # For the --payload CLI argument
+    return binascii.hexlify(build_dns_query(qname, qtype)).decode("ascii")
+
+
+def build_dns_query_b64(qname: str = "example.com", qtype: int = 1) -> str:
+    # Smaller encoding for the JSON job protocol (pairs with --payload-b64)
+    return base64.b64encode(build_dns_query(qname, qtype)).decode("ascii")
 
 
 # ---------------------------------------------------------------------------
@@ -284,6 +574,8 @@ def build_dns_query_hex(qname: str = "example.com", qtype: int = 1) -> str:
 class TestCase:
     name: str
     fn: callable
+    # Timing-sensitive cases run alone, outside the thread pool
+    parallel: bool = True
 
 
 def expect(cond: bool, msg: str) -> Tuple[bool, str]:
@@ -296,13 +588,13 @@ def test_tcp_success_local(bin_path: str) -> Tuple[bool, str]:
     try:
         res = run_knocker(
             bin_path,
-            host="127.0.0.1",
-            protocol="tcp",
+            host=LH,
+            protocol=TCP,
             sequence=[srv.port],
             timeout_ms=800,
             retries=1,
         )
-        ok = res.code == 0 and f"TCP 127.0.0.1:{srv.port} OK" in res.out
+        ok = res.code == 0 and f"TCP {LH}:{srv.port} OK" in res.out
         return expect(ok, f"stdout: {res.out.strip()} stderr: {res.err.strip()}")
     finally:
         srv.stop()
@@ -313,8 +605,8 @@ def test_tcp_err_refused(bin_path: str) -> Tuple[bool, str]:
     port = 1
     res = run_knocker(
         bin_path,
-        host="127.0.0.1",
-        protocol="tcp",
+        host=LH,
+        protocol=TCP,
         sequence=[port],
         timeout_ms=500,
         retries=1,
@@ -329,15 +621,15 @@ def test_udp_success_local_echo(bin_path: str) -> Tuple[bool, str]:
     try:
         res = run_knocker(
             bin_path,
-            host="127.0.0.1",
-            protocol="udp",
+            host=LH,
+            protocol=UDP,
             sequence=[srv.port],
             timeout_ms=700,
             retries=1,
         )
         ok = (
             res.code == 0
-            and f"UDP 127.0.0.1:{srv.port} received " in res.out
+            and f"UDP {LH}:{srv.port} received " in res.out
         )
         return expect(ok, f"stdout: {res.out.strip()} stderr: {res.err.strip()}")
     finally:
@@ -350,7 +642,7 @@ def test_public_tcp_google_443(bin_path: str) -> Tuple[bool, str]:
     res = run_knocker(
         bin_path,
         host="www.google.com",
-        protocol="tcp",
+        protocol=TCP,
         sequence=[443],
         timeout_ms=1500,
         retries=1,
@@ -366,7 +658,7 @@ def test_public_udp_dns_query(bin_path: str) -> Tuple[bool, str]:
     res = run_knocker(
         bin_path,
         host="8.8.8.8",
-        protocol="udp",
+        protocol=UDP,
         sequence=[53],
         timeout_ms=1500,
         retries=1,
@@ -380,8 +672,8 @@ def test_public_udp_dns_query(bin_path: str) -> Tuple[bool, str]:
 def test_invalid_payload_hex(bin_path: str) -> Tuple[bool, str]:
     res = run_knocker(
         bin_path,
-        host="127.0.0.1",
-        protocol="udp",
+        host=LH,
+        protocol=UDP,
         sequence=[9],
         timeout_ms=300,
         retries=1,
@@ -397,7 +689,7 @@ def test_dns_resolution_error(bin_path: str) -> Tuple[bool, str]:
     res = run_knocker(
         bin_path,
         host="nonexistent.invalid",
-        protocol="tcp",
+        protocol=TCP,
         sequence=[80],
         timeout_ms=500,
         retries=1,
@@ -413,7 +705,7 @@ def test_concurrency_udp_timeout(bin_path: str) -> Tuple[bool, str]:
     host = "8.8.8.8"
     if os.environ.get("SKIP_PUBLIC") == "1":
         # Fallback to localhost closed UDP port; may produce immediate errors.
-        host = "127.0.0.1"
+        host = LH
 
     # Two knocks that should both wait until timeout if no reply
     seq = [9, 19]
@@ -422,7 +714,7 @@ def test_concurrency_udp_timeout(bin_path: str) -> Tuple[bool, str]:
     res_seq = run_knocker(
         bin_path,
         host=host,
-        protocol="udp",
+        protocol=UDP,
         sequence=seq,
         timeout_ms=to_ms,
         retries=1,
@@ -433,7 +725,7 @@ def test_concurrency_udp_timeout(bin_path: str) -> Tuple[bool, str]:
     res_par = run_knocker(
         bin_path,
         host=host,
-        protocol="udp",
+        protocol=UDP,
         sequence=seq,
         timeout_ms=to_ms,
         retries=1,
@@ -453,15 +745,9 @@ def test_retries_behavior_udp(bin_path: str) -> Tuple[bool, str]:
     # Use a local UDP server that does NOT reply to simulate timeouts,
     # so we can observe multiple attempts in total runtime.
     class SilentUdpServer(UdpEchoServer):
-        def _run(self):
-            while not self.stop_ev.is_set():
-                try:
-                    # Read and DO NOT reply
-                    self.sock.recvfrom(2048)
-                except socket.timeout:
-                    continue
-                except OSError:
-                    break
+        def _handle(self, data: memoryview, addr):
+            # Read and DO NOT reply
+            pass
 
     srv = SilentUdpServer()
     srv.start()
@@ -472,17 +758,18 @@ def test_retries_behavior_udp(bin_path: str) -> Tuple[bool, str]:
 
         res = run_knocker(
             bin_path,
-            host="127.0.0.1",
-            protocol="udp",
+            host=LH,
+            protocol=UDP,
             sequence=[srv.port],
             timeout_ms=to_ms,
             retries=retries,
             backoff_ms=backoff_ms,
         )
         # Minimal expected duration: retries * timeout + (retries-1) * backoff
-        min_expected = (retries * to_ms + (retries - 1) * backoff_ms) / 1000.0
-        ok = res.duration_s >= (min_expected * 0.9)  # allow some slack
-        msg = (f"duration={res.duration_s:.3f}s min_expected={min_expected:.3f}s "
+        min_expected_ns = (retries * to_ms + (retries - 1) * backoff_ms) * 1_000_000
+        ok = res.duration_ns * 10 >= min_expected_ns * 9  # allow 10% slack
+        msg = (f"duration={res.duration_s:.3f}s "
+               f"min_expected={min_expected_ns / 1e9:.3f}s "
                f"stdout={res.out.strip()} stderr={res.err.strip()}")
         return expect(ok, msg)
     finally:
@@ -493,41 +780,106 @@ def test_retries_behavior_udp(bin_path: str) -> Tuple[bool, str]:
 # Runner
 # ---------------------------------------------------------------------------
 
+def format_result(name: str, ok: bool, msg: str) -> str:
+    return f"- {name} ... {'PASS' if ok else 'FAIL'}\n  {msg}\n\n"
+
+
+def start_printer(
+    log_q: "queue.Queue[Optional[Tuple[int, str]]]",
+) -> threading.Thread:
+    # Single writer for stdout: workers hand over (declaration index, block)
+    # pairs, and each block is released only once every case declared before
+    # it has been printed, so output is in declaration order and never
+    # interleaves. None stops the printer.
+    def drain():
+        pending: Dict[int, str] = {}
+        next_idx = 0
+        while True:
+            item = log_q.get()
+            if item is None:
+                return
+            idx, block = item
+            pending[idx] = block
+            while next_idx in pending:
+                sys.stdout.write(pending.pop(next_idx))
+                sys.stdout.flush()
+                next_idx += 1
+
+    printer = threading.Thread(target=drain, daemon=True)
+    printer.start()
+    return printer
+
+
+async def run_tests(
+    tests: List[TestCase], log_q: "queue.Queue[Optional[Tuple[int, str]]]"
+) -> Dict[str, Tuple[bool, str]]:
+    # Each case only blocks on the knocker subprocess, so independent cases
+    # run concurrently in worker threads; timing-sensitive ones run alone first.
+    index = {t.name: i for i, t in enumerate(tests)}
+
+    async def run_one(t: TestCase) -> Tuple[bool, str]:
+        try:
+            res = await asyncio.to_thread(t.fn)
+        except Exception as e:
+            res = (False, f"exception: {e!r}")
+        log_q.put((index[t.name], format_result(t.name, *res)))
+        return res
+
+    # One thread per parallel case, so none of them queue behind the slow
+    # public/retry cases the way they would with the default executor's size
+    parallel_tests = [t for t in tests if t.parallel]
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=max(1, len(parallel_tests)))
+    )
+
+    results = {}
+    for t in tests:
+        if not t.parallel:
+            results[t.name] = await run_one(t)
+
+    outcomes = await asyncio.gather(*(run_one(t) for t in parallel_tests))
+    results.update((t.name, r) for t, r in zip(parallel_tests, outcomes))
+    return results
+
+
 def main():
+    # Dump all thread stacks on a fatal signal, and once more if the whole
+    # run is still going after RUN_WATCHDOG_S (i.e. something hangs)
+    faulthandler.enable()
+    faulthandler.dump_traceback_later(RUN_WATCHDOG_S, exit=False)
     bin_path = find_or_build_binary()
     tests: List[TestCase] = [
-        TestCase("TCP local success", lambda: test_tcp_success_local(bin_path)),
-        TestCase("TCP local refused", lambda: test_tcp_err_refused(bin_path)),
+        TestCase("TCP local success",
+                 functools.partial(test_tcp_success_local, bin_path)),
+        TestCase("TCP local refused",
+                 functools.partial(test_tcp_err_refused, bin_path)),
         TestCase("UDP local echo success",
-                 lambda: test_udp_success_local_echo(bin_path)),
+                 functools.partial(test_udp_success_local_echo, bin_path)),
         TestCase("Public TCP google:443",
-                 lambda: test_public_tcp_google_443(bin_path)),
+                 functools.partial(test_public_tcp_google_443, bin_path)),
         TestCase("Public UDP DNS query 8.8.8.8:53",
-                 lambda: test_public_udp_dns_query(bin_path)),
-        TestCase("Invalid payload hex", lambda: test_invalid_payload_hex(bin_path)),
-        TestCase("DNS resolution error", lambda: test_dns_resolution_error(bin_path)),
+                 functools.partial(test_public_udp_dns_query, bin_path)),
+        TestCase("Invalid payload hex",
+                 functools.partial(test_invalid_payload_hex, bin_path)),
+        TestCase("DNS resolution error",
+                 functools.partial(test_dns_resolution_error, bin_path)),
         TestCase("Concurrency UDP timing",
-                 lambda: test_concurrency_udp_timeout(bin_path)),
+                 functools.partial(test_concurrency_udp_timeout, bin_path),
+                 parallel=False),
         TestCase("UDP retries/backoff timing",
-                 lambda: test_retries_behavior_udp(bin_path)),
+                 functools.partial(test_retries_behavior_udp, bin_path)),
     ]
 
-    passed = 0
-    failed = 0
-    print("\n=== async_port_knocker functional tests ===\n")
-    for t in tests:
-        print(f"- {t.name} ...", end=" ", flush=True)
-        ok, msg = t.fn()
-        if ok:
-            print("PASS")
-            print(f"  {msg}")
-            passed += 1
-        else:
-            print("FAIL")
-            print(f"  {msg}")
-            failed += 1
-        print()
+    print("\n=== async_port_knocker functional tests ===\n", flush=True)
+    log_q: "queue.Queue[Optional[Tuple[int, str]]]" = queue.Queue()
+    printer = start_printer(log_q)
+    results = asyncio.run(run_tests(tests, log_q))
+    log_q.put(None)
+    printer.join()
+    faulthandler.cancel_dump_traceback_later()
 
+    passed = sum(1 for ok, _msg in results.values() if ok)
+    failed = len(results) - passed
     total = passed + failed
     print(f"Summary: {passed}/{total} passed, {failed} failed.")
     if failed > 0: